@@ -1,11 +1,21 @@
+import warnings
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from datetime import datetime
 
 from backend.delivery_queue import DeliveryQueue
 
-app = FastAPI()
+# orjson serializes in C and handles datetime natively, so large /api/queue
+# responses skip the pure-Python json encoder. FastAPI >= 0.141 deprecates
+# ORJSONResponse in favour of return-type/response-model serialization; these
+# endpoints return plain dicts without response models, so we keep orjson
+# deliberately and silence that one deprecation notice until the routes grow
+# proper response models.
+warnings.filterwarnings("ignore", message="ORJSONResponse is deprecated")
+app = FastAPI(default_response_class=ORJSONResponse)
 
 dq = DeliveryQueue()
 
@@ -42,9 +52,25 @@ def enqueue_request(req: RequestModel):
     priority = dq.add_request(r)
     return {"status": "enqueued", "computed_priority": priority}
 
+@app.post("/api/requests/bulk")
+def enqueue_requests_bulk(reqs: list[RequestModel]):
+    rows = [r.model_dump() for r in reqs]
+
+    # basic datetime validation (same rules as the single-request endpoint)
+    for r in rows:
+        try:
+            datetime.fromisoformat(r["timestamp"])
+            if r.get("expiry_date"):
+                datetime.fromisoformat(r["expiry_date"])
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Bad datetime format: {e}")
+
+    priorities = dq.add_many(rows)
+    return {"status": "enqueued", "count": len(priorities), "computed_priorities": priorities}
+
 @app.get("/api/queue")
-def get_queue():
-    return {"size": len(dq), "items": dq.list_all()}
+def get_queue(limit: int | None = None):
+    return {"size": len(dq), "items": dq.list_all(limit)}
 
 @app.post("/api/dispatch")
 def dispatch_next():
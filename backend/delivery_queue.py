@@ -1,92 +1,146 @@
 # backend/delivery_queue.py
 
+import array
+import atexit
 import heapq
+import os
+import queue
 from datetime import datetime, timezone
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import NamedTuple
 import logging
+import threading
+import time
+
+# UTC singleton hoisted once; datetime.fromisoformat interns the zero-offset
+# case to this same object, and non-zero offsets are deduplicated upstream by
+# the _parse_iso_utc string cache, so no per-offset tzinfo cache is needed.
+_UTC = timezone.utc
 
 # simple logger for queue events — writes timestamps automatically
 logger = logging.getLogger("delivery_queue")
 logger.setLevel(logging.INFO)
 
 if not logger.handlers:
-    # log file in current working directory
+    # Records go onto an in-process queue; a background listener thread does
+    # the actual write to the log file (in the current working directory), so
+    # enqueue/dispatch never block on disk I/O.
+    _log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(_log_queue))
+
     fh = logging.FileHandler("queue.log", encoding="utf-8")
     formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
     fh.setFormatter(formatter)
-    logger.addHandler(fh)
+    _log_listener = QueueListener(_log_queue, fh)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+
+def _parse_iso_utc(s):
+    """Parse an ISO-8601 string and return a UTC-aware datetime."""
+    dt = datetime.fromisoformat(s)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=_UTC)
+    return dt.astimezone(_UTC)
+
+
+# Repeated timestamp strings are very common in CSV bulk imports and in the
+# simulators (anchored dates repeat), so memoize parses by the raw string.
+# datetime objects are immutable, so sharing the cached result is safe.
+# Set DQ_CACHE=0 to disable the cache.
+if os.environ.get("DQ_CACHE", "1") != "0":
+    _parse_iso_utc = lru_cache(maxsize=1 << 15)(_parse_iso_utc)
+
+
+# Supply types interned to small integer ids; BASE_BY_ID[5] is the default
+# base priority for unknown types. An array index replaces a string-hash dict
+# lookup on the hot path (and is usable from jitted code, unlike a dict).
+SUPPLY_IDS = {"Medical Kit": 0, "Water": 1, "Food": 2, "Blanket": 3, "Tarpaulin": 4}
+BASE_BY_ID = array.array("b", [10, 6, 4, 2, 1, 3])
+
+
+class QueueItem(NamedTuple):
+    """Lightweight view over a heap entry; avoids a dict per item."""
+    priority: float
+    timestamp: datetime
+    request: dict
 
 
 class DeliveryQueue:
     def __init__(self):
         self._heap = []
         self._counter = 0
-        self.base_priority = {
-            "Medical Kit": 10,
-            "Water": 6,
-            "Food": 4,
-            "Blanket": 2,
-            "Tarpaulin": 1,
-        }
+        # FastAPI runs these def endpoints on a threadpool, so heap mutations
+        # need a lock; priority computation happens outside it
+        self._lock = threading.Lock()
+        # kept for external readers; derived from the id tables above
+        self.base_priority = {name: BASE_BY_ID[i] for name, i in SUPPLY_IDS.items()}
 
     def _parse_dt(self, v):
         """Parse ISO string or datetime and return a UTC-aware datetime, or None."""
         if v is None or v == "":
             return None
         if isinstance(v, str):
-            dt = datetime.fromisoformat(v)
-            if dt.tzinfo is None:
-                return dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc)
+            return _parse_iso_utc(v)
         if isinstance(v, datetime):
             if v.tzinfo is None:
-                return v.replace(tzinfo=timezone.utc)
-            return v.astimezone(timezone.utc)
+                return v.replace(tzinfo=_UTC)
+            return v.astimezone(_UTC)
         return None
 
     def _compute_priority(self, req, now=None):
-        """Compute numeric priority for a request (higher = more urgent)."""
+        """Compute numeric priority for a request (higher = more urgent).
+
+        Safe path for raw dicts: parses any ISO strings before delegating
+        to the float-only core that add_request uses directly. Requests
+        that already went through _prepare carry a cached _ts_epoch and
+        normalized datetimes, so no re-parsing happens for them.
+        """
         if now is None:
-            now = datetime.now(timezone.utc)
+            now = datetime.now(_UTC)
+        now_epoch = now.timestamp()
 
-        # Base by type
-        base = self.base_priority.get(req.get("supply_type"), 3)
+        base = BASE_BY_ID[SUPPLY_IDS.get(req.get("supply_type"), 5)]
 
-        # Expiry bonus (if expiry_date provided)
-        expiry_bonus = 0
         expiry = req.get("expiry_date")
-        expiry = self._parse_dt(expiry)
-        if expiry:
-            days_left = (expiry - now).total_seconds() / 86400.0
-            if days_left <= 0:
-                expiry_bonus += 0  # already expired -> no bonus
-            elif days_left <= 2:
-                expiry_bonus += 2
-            elif days_left <= 7:
-                expiry_bonus += 1
+        if not (isinstance(expiry, datetime) and expiry.tzinfo is not None):
+            expiry = self._parse_dt(expiry)
+        expiry_epoch = expiry.timestamp() if expiry else None
+
+        ts_epoch = req.get("_ts_epoch")
+        if ts_epoch is None:
+            timestamp = req.get("timestamp")
+            if not (isinstance(timestamp, datetime) and timestamp.tzinfo is not None):
+                timestamp = self._parse_dt(timestamp)
+            ts_epoch = timestamp.timestamp() if timestamp else now_epoch
+
+        return self._priority_from_epochs(
+            base, ts_epoch, expiry_epoch, now_epoch, req.get("distance_km")
+        )
+
+    def _priority_from_epochs(self, base, ts_epoch, expiry_epoch, now_epoch, distance_km):
+        """Priority core on epoch-second floats; no datetime arithmetic."""
+        # Expiry bonus: expired -> 0; within 2 days -> 2; within a week -> 1
+        expiry_bonus = 0
+        if expiry_epoch is not None:
+            days_left = (expiry_epoch - now_epoch) / 86400.0
+            expiry_bonus = 2 if 0 < days_left <= 2 else (1 if 2 < days_left <= 7 else 0)
 
         # Wait-time bonus: +1 per full hour waited up to a cap (e.g., 6)
-        timestamp = req.get("timestamp")
-        timestamp = self._parse_dt(timestamp)
-        hours_waited = 0
-        if timestamp:
-            hours_waited = max(0, int((now - timestamp).total_seconds() // 3600))
-        wait_bonus = min(hours_waited, 6)
-
-        # Distance factor (optional): small boost for nearby locations when priorities tie
-        distance_km = req.get("distance_km", None)
-        distance_bonus = 0
-        if distance_km is not None:
-            try:
-                d = float(distance_km)
-                if d <= 5:
-                    distance_bonus = 0.5
-                elif d <= 20:
-                    distance_bonus = 0.2
-            except Exception:
-                distance_bonus = 0
-
-        priority = base + expiry_bonus + wait_bonus + distance_bonus
-        return float(priority)
+        wait_bonus = 0
+        hours_waited = int((now_epoch - ts_epoch) // 3600)
+        if hours_waited > 0:
+            wait_bonus = hours_waited if hours_waited < 6 else 6
+
+        # Distance factor (optional): small boost for nearby locations when
+        # priorities tie. Pydantic already coerces distance_km to float | None
+        # on the API path, so a type check replaces the try/except.
+        distance_bonus = 0.0
+        if isinstance(distance_km, (int, float)):
+            distance_bonus = 0.5 if distance_km <= 5 else (0.2 if distance_km <= 20 else 0.0)
+
+        return float(base + expiry_bonus + wait_bonus + distance_bonus)
 
     def add_request(self, request):
         """Add a request dict to the queue. Request must contain:
@@ -94,76 +148,147 @@ class DeliveryQueue:
         - id, supply_type, quantity, timestamp (ISO string or datetime)
         optional: expiry_date (ISO/datetime), distance_km (float)
         """
-        now = datetime.now(timezone.utc)
+        # one clock read; the datetime object is only built if actually needed
+        now_epoch = time.time()
+        pr, ts_epoch = self._prepare(request, now_epoch)
 
+        # push (neg priority for max-heap effect, epoch seconds for tie-breaker,
+        # counter, request) — heap sift now compares C-level floats
+        with self._lock:
+            heapq.heappush(self._heap, (-pr, ts_epoch, self._counter, request))
+            self._counter += 1
+
+        # logging (_prepare guarantees timestamp is a datetime here)
+        ts_iso = request["timestamp"].isoformat()
+        logger.info(
+            "ENQUEUE id=%s type=%s priority=%s ts=%s dest=%s",
+            request.get("id"), request.get("supply_type"), pr, ts_iso,
+            request.get("destination"),
+        )
+
+        return pr
+
+    def add_many(self, requests):
+        """Bulk enqueue a list of request dicts; returns their priorities.
+
+        Appends all heap tuples first and runs a single heapify — O(n)
+        instead of n heappushes at O(log n) each.
+        """
+        now_epoch = time.time()
+
+        # normalize and score outside the lock; only the heap edit is serialized
+        prepared = []
+        priorities = []
+        for request in requests:
+            pr, ts_epoch = self._prepare(request, now_epoch)
+            prepared.append((pr, ts_epoch, request))
+            priorities.append(pr)
+            # same per-item audit line as add_request; formatting and I/O
+            # happen on the QueueListener thread, not here
+            logger.info(
+                "ENQUEUE id=%s type=%s priority=%s ts=%s dest=%s",
+                request.get("id"), request.get("supply_type"), pr,
+                request["timestamp"].isoformat(), request.get("destination"),
+            )
+
+        with self._lock:
+            heap = self._heap
+            counter = self._counter
+            for pr, ts_epoch, request in prepared:
+                heap.append((-pr, ts_epoch, counter, request))
+                counter += 1
+            self._counter = counter
+            heapq.heapify(heap)
+
+        logger.info("ENQUEUE_BULK count=%d", len(priorities))
+        return priorities
+
+    def _prepare(self, request, now_epoch):
+        """Normalize timestamps in-place and return (priority, ts_epoch)."""
         # normalize timestamps to UTC-aware datetime objects (allow blank -> now)
         ts = request.get("timestamp")
         if ts is None or ts == "":
-            ts = now
+            ts = None
+        elif isinstance(ts, str):
+            # common case on the API path; skip the isinstance ladder
+            ts = _parse_iso_utc(ts)
         else:
             ts = self._parse_dt(ts)
         if ts is None:
-            ts = now
+            ts = datetime.fromtimestamp(now_epoch, _UTC)
+            ts_epoch = now_epoch
+        else:
+            ts_epoch = ts.timestamp()
         request["timestamp"] = ts
+        # keep the epoch alongside the datetime so hot paths stay on floats
+        request["_ts_epoch"] = ts_epoch
 
         # also normalize expiry if present (so later code can use it directly)
+        expiry_epoch = None
         if "expiry_date" in request:
-            request["expiry_date"] = self._parse_dt(request.get("expiry_date"))
+            expiry = self._parse_dt(request.get("expiry_date"))
+            request["expiry_date"] = expiry
+            if expiry is not None:
+                expiry_epoch = expiry.timestamp()
 
-        # compute priority
-        pr = self._compute_priority(request, now=now)
-
-        # push (neg priority for max-heap effect, timestamp for tie-breaker, counter, request)
-        heapq.heappush(self._heap, (-pr, request["timestamp"], self._counter, request))
-        self._counter += 1
-
-        # logging
-        try:
-            ts_iso = request["timestamp"].isoformat()
-        except Exception:
-            ts_iso = str(request["timestamp"])
-        logger.info(
-            f"ENQUEUE id={request.get('id')} "
-            f"type={request.get('supply_type')} "
-            f"priority={pr} ts={ts_iso} dest={request.get('destination')}"
+        # compute priority (float-only core; everything is normalized here)
+        sid = SUPPLY_IDS.get(request.get("supply_type"), 5)
+        request["_sid"] = sid
+        base = BASE_BY_ID[sid]
+        pr = self._priority_from_epochs(
+            base, ts_epoch, expiry_epoch, now_epoch, request.get("distance_km")
         )
-
-        return pr
+        return pr, ts_epoch
 
     def peek(self):
         """Return the top item (without removing), with computed priority."""
-        if not self._heap:
-            return None
-        pr_neg, ts, cnt, req = self._heap[0]
-        return {"priority": -pr_neg, "timestamp": ts, "request": req}
+        with self._lock:
+            if not self._heap:
+                return None
+            pr_neg, ts_epoch, cnt, req = self._heap[0]
+        return {
+            "priority": -pr_neg,
+            "timestamp": datetime.fromtimestamp(ts_epoch, _UTC),
+            "request": req,
+        }
 
     def pop(self):
         """Remove and return the top request with its computed priority."""
-        if not self._heap:
-            return None
-        pr_neg, ts, cnt, req = heapq.heappop(self._heap)
+        with self._lock:
+            if not self._heap:
+                return None
+            pr_neg, ts_epoch, cnt, req = heapq.heappop(self._heap)
         pr = -pr_neg
+        ts = datetime.fromtimestamp(ts_epoch, _UTC)
 
-        try:
-            ts_iso = ts.isoformat()
-        except Exception:
-            ts_iso = str(ts)
         logger.info(
-            f"POP id={req.get('id')} "
-            f"type={req.get('supply_type')} "
-            f"priority={pr} ts={ts_iso} dest={req.get('destination')}"
+            "POP id=%s type=%s priority=%s ts=%s dest=%s",
+            req.get("id"), req.get("supply_type"), pr, ts.isoformat(),
+            req.get("destination"),
         )
 
         return {"priority": pr, "timestamp": ts, "request": req}
 
-    def list_all(self):
-        """Return a snapshot list of all items sorted by priority (highest first)."""
-        items = sorted(self._heap)  # sorted ascending by tuple
-        result = []
-        for pr_neg, ts, cnt, req in items:
-            result.append({"priority": -pr_neg, "timestamp": ts, "request": req})
-        # sorted() gives smallest first; we want highest priority first so reverse
-        return list(reversed(result))
+    def iter_items(self, limit=None):
+        """Lazily yield QueueItem views sorted by priority (highest first).
+
+        Heap tuples start with the negated priority, so ascending tuple order
+        is already highest-priority-first. With `limit` set, heapq.nsmallest
+        gives the top k in O(n + k log n) instead of a full sort. Items are
+        yielded one at a time, so callers that stop early (or only want the
+        size) never pay for wrapping the whole queue.
+        """
+        with self._lock:
+            if limit is not None:
+                items = heapq.nsmallest(limit, self._heap)
+            else:
+                items = sorted(self._heap)
+        for pr_neg, ts_epoch, cnt, req in items:
+            yield QueueItem(-pr_neg, datetime.fromtimestamp(ts_epoch, _UTC), req)
+
+    def list_all(self, limit=None):
+        """Return a snapshot list of items sorted by priority (highest first)."""
+        return [item._asdict() for item in self.iter_items(limit)]
 
     def __len__(self):
         return len(self._heap)
@@ -9,34 +9,42 @@ Usage:
     python sim_priority_vs_fifo_fixed.py
 """
 
-import heapq
-import random
+import array
 import math
 import statistics
-from collections import deque
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+import numpy as np
 import matplotlib.pyplot as plt
 
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; without it the loops run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
 # ---------------------------
 # Priority computation (same rules as DeliveryQueue)
 # ---------------------------
-BASE_PRIORITY = {
-    'Medical Kit': 10,
-    'Water': 6,
-    'Food': 4,
-    'Blanket': 2,
-    'Tarpaulin': 1
-}
-
-def compute_priority(req, now_dt):
-    """Compute numeric priority for request (float). now_dt is a timezone-aware datetime."""
-    base = BASE_PRIORITY.get(req['supply_type'], 3)
+# Same id tables as DeliveryQueue: supply types interned to small integers,
+# base priority read by array index (index 5 = default for unknown types)
+SUPPLY_IDS = {'Medical Kit': 0, 'Water': 1, 'Food': 2, 'Blanket': 3, 'Tarpaulin': 4}
+BASE_BY_ID = array.array('b', [10, 6, 4, 2, 1, 3])
+
+def compute_priority(req, now_s):
+    """Compute numeric priority for request (float). now_s is seconds since the anchor."""
+    sid = req.get('supply_id')
+    if sid is None:
+        sid = SUPPLY_IDS.get(req['supply_type'], 5)
+    base = BASE_BY_ID[sid]
 
     # expiry bonus
     expiry_bonus = 0.0
-    expiry = req.get('expiry_date')  # expected as aware datetime or None
-    if expiry:
-        days_left = (expiry - now_dt).total_seconds() / 86400.0
+    expiry_s = req.get('expiry_s')  # seconds since anchor, or None
+    if expiry_s is not None:
+        days_left = (expiry_s - now_s) / 86400.0
         if days_left <= 0:
             expiry_bonus += 0
         elif days_left <= 2:
@@ -45,71 +53,89 @@ def compute_priority(req, now_dt):
             expiry_bonus += 1
 
     # wait bonus (compute using request timestamp)
-    ts = req.get('timestamp')
+    ts_s = req.get('timestamp_s')
     hours_waited = 0
-    if ts:
-        hours_waited = max(0, int((now_dt - ts).total_seconds() // 3600))
+    if ts_s is not None:
+        hours_waited = max(0, int((now_s - ts_s) // 3600))
     wait_bonus = min(hours_waited, 6)
 
-    # distance
+    # distance (the generator always emits numbers, so no coercion needed)
     distance_bonus = 0.0
     d = req.get('distance_km')
-    if d is not None:
-        try:
-            dd = float(d)
-            if dd <= 5:
-                distance_bonus = 0.5
-            elif dd <= 20:
-                distance_bonus = 0.2
-        except:
-            distance_bonus = 0.0
+    if isinstance(d, (int, float)):
+        if d <= 5:
+            distance_bonus = 0.5
+        elif d <= 20:
+            distance_bonus = 0.2
 
     return float(base + expiry_bonus + wait_bonus + distance_bonus)
 
 # ---------------------------
 # Workload generator (anchored)
 # ---------------------------
+EXPIRY_DAYS = {
+    'Medical Kit': [0.5, 1, 3, 10],
+    'Water': [1, 3, 7, 20],
+}
+EXPIRY_DAYS_DEFAULT = [3, 7, 30]
+
+
 def generate_arrivals(total_time_s, arrival_rate, seed=1, supply_mix=None, anchor=None):
     """
     Generate arrival events over [0, total_time_s).
     arrival_rate = lambda (events per second).
-    Returns list of (arrival_time_seconds, request_dict).
+    Returns list of (arrival_time_seconds, request_dict). All times in the
+    request dicts (timestamp_s, expiry_s) are float seconds since `anchor`;
+    materialize datetimes with anchor + timedelta(seconds=...) only at output.
     """
-    rnd = random.Random(seed)
-    if anchor is None:
-        anchor = datetime.now(timezone.utc)
-    t = 0.0
-    arrivals = []
+    if arrival_rate <= 0:
+        return []
     if supply_mix is None:
         supply_mix = ['Medical Kit','Water','Food','Blanket','Tarpaulin']
 
-    while t < total_time_s:
-        if arrival_rate <= 0:
-            break
-        inter = rnd.expovariate(arrival_rate)
-        t += inter
-        if t >= total_time_s:
-            break
-        s = rnd.choice(supply_mix)
-        # expiry selection
-        if s == 'Medical Kit':
-            expiry_days = rnd.choice([0.5, 1, 3, 10])
-        elif s == 'Water':
-            expiry_days = rnd.choice([1, 3, 7, 20])
-        else:
-            expiry_days = rnd.choice([3, 7, 30])
-        expiry_dt = anchor + timedelta(days=expiry_days)
-        timestamp_dt = anchor + timedelta(seconds=t)
-        req = {
-            'id': f"A{int(t*1000)}_{rnd.randint(0,999)}",
-            'supply_type': s,
-            'quantity': rnd.randint(1,50),
-            'timestamp': timestamp_dt,
-            'expiry_date': expiry_dt,
-            'distance_km': rnd.choice([1,3,8,12,25])
-        }
-        arrivals.append((t, req))
-    return arrivals
+    rng = np.random.default_rng(seed)
+
+    # draw interarrival gaps in slabs until the cumulative time passes the horizon
+    slab = max(16, int(total_time_s * arrival_rate * 1.5) + 16)
+    times = rng.exponential(1.0 / arrival_rate, size=slab).cumsum()
+    while times[-1] < total_time_s:
+        more = times[-1] + rng.exponential(1.0 / arrival_rate, size=slab).cumsum()
+        times = np.concatenate([times, more])
+    times = times[times < total_time_s]
+    n = len(times)
+
+    # per-arrival attributes as vectors, one C-level call each
+    supply_idx = rng.integers(0, len(supply_mix), size=n)
+    quantities = rng.integers(1, 51, size=n)
+    distances = rng.choice(np.array([1, 3, 8, 12, 25]), size=n)
+    id_suffix = rng.integers(0, 1000, size=n)
+    mix_ids = [SUPPLY_IDS.get(s, 5) for s in supply_mix]
+
+    # expiry selection: same per-type option lists as before, chosen uniformly;
+    # rows are padded to equal width but the draw never reaches the padding
+    expiry_opts = [EXPIRY_DAYS.get(s, EXPIRY_DAYS_DEFAULT) for s in supply_mix]
+    opt_lens = np.array([len(o) for o in expiry_opts])
+    opt_mat = np.zeros((len(expiry_opts), opt_lens.max()))
+    for i, o in enumerate(expiry_opts):
+        opt_mat[i, :len(o)] = o
+    opt_col = np.floor(rng.random(n) * opt_lens[supply_idx]).astype(np.int64)
+    expiry_days = opt_mat[supply_idx, opt_col]
+
+    return [
+        (t, {
+            'id': f"A{int(t*1000)}_{sfx}",
+            'supply_type': supply_mix[si],
+            'supply_id': mix_ids[si],
+            'quantity': q,
+            'timestamp_s': t,
+            'expiry_s': e * 86400.0,
+            'distance_km': d,
+        })
+        for t, si, q, d, e, sfx in zip(
+            times.tolist(), supply_idx.tolist(), quantities.tolist(),
+            distances.tolist(), expiry_days.tolist(), id_suffix.tolist(),
+        )
+    ]
 
 # ---------------------------
 # Helper: percentile (robust)
@@ -130,107 +156,139 @@ def percentile(data, p):
 # ---------------------------
 # Simulators
 # ---------------------------
-def simulate(arrivals, service_rate, discipline='priority', seed=42, anchor=None):
+# Hot loops below work on parallel float arrays (SoA) only, so numba can JIT
+# them when installed; the dict/record bookkeeping stays in the wrapper.
+
+@njit
+def _service_loop_priority(arrival_t, neg_pr, service_times):
+    """Single-server priority run. Returns (dispatch order, service starts).
+
+    The ready queue is an intrusive binary heap over two parallel arrays:
+    float keys (negated priority) and int64 arrival indices. Sifts compare
+    raw floats — with the index as tie-breaker, matching the old
+    (neg_priority, counter) tuple order — instead of building and
+    comparing tuples through heapq.
+    """
+    n = len(arrival_t)
+    order = np.empty(n, np.int64)
+    start = np.empty(n, np.float64)
+    keys = np.empty(n, np.float64)
+    idx = np.empty(n, np.int64)
+    size = 0
+    i = 0  # next arrival to enqueue
+    t = 0.0
+    for k in range(n):
+        if size == 0 and t < arrival_t[i]:
+            # server idle; jump to the next arrival
+            t = arrival_t[i]
+        while i < n and arrival_t[i] <= t + 1e-12:
+            # push (neg_pr[i], i): append at the end, sift up
+            c = size
+            keys[c] = neg_pr[i]
+            idx[c] = i
+            size += 1
+            while c > 0:
+                parent = (c - 1) >> 1
+                if keys[c] < keys[parent] or (keys[c] == keys[parent] and idx[c] < idx[parent]):
+                    keys[c], keys[parent] = keys[parent], keys[c]
+                    idx[c], idx[parent] = idx[parent], idx[c]
+                    c = parent
+                else:
+                    break
+            i += 1
+        # pop the root: move the last leaf up, sift down
+        j = idx[0]
+        size -= 1
+        keys[0] = keys[size]
+        idx[0] = idx[size]
+        c = 0
+        while True:
+            child = 2 * c + 1
+            if child >= size:
+                break
+            right = child + 1
+            if right < size and (keys[right] < keys[child] or (keys[right] == keys[child] and idx[right] < idx[child])):
+                child = right
+            if keys[child] < keys[c] or (keys[child] == keys[c] and idx[child] < idx[c]):
+                keys[c], keys[child] = keys[child], keys[c]
+                idx[c], idx[child] = idx[child], idx[c]
+                c = child
+            else:
+                break
+        order[k] = j
+        start[k] = t
+        t += service_times[k]
+    return order, start
+
+
+@njit
+def _service_loop_fifo(arrival_t, service_times):
+    """Single-server FIFO run: dispatch order equals arrival order."""
+    n = len(arrival_t)
+    order = np.empty(n, np.int64)
+    start = np.empty(n, np.float64)
+    t = 0.0
+    for k in range(n):
+        order[k] = k
+        if t < arrival_t[k]:
+            t = arrival_t[k]
+        start[k] = t
+        t += service_times[k]
+    return order, start
+
+
+def simulate(arrivals, service_rate, discipline='priority', seed=42, anchor=None,
+             service_times=None):
     """
     Simulate given arrival list [(arrival_time_seconds, req), ...]
     service_rate: mu (services per second) -> mean service time = 1/mu
     discipline: 'priority' or 'fifo'
+    service_times: optional pre-drawn vector; pass the same one to both
+    disciplines so they see an identical service stream (run_sweep does this).
     Returns metrics dict with per-request waits and other stats.
     """
-    rnd = random.Random(seed)
-    if anchor is None:
-        anchor = datetime.now(timezone.utc)
-
-    now = 0.0
-    next_arrival_index = 0
-    server_busy_until = 0.0
-    server_busy = False
-    current_request = None
-
-    if discipline == 'priority':
-        heap = []  # (-priority, counter, enqueue_time, req)
-        counter = 0
-    else:
-        q = deque()
-
+    n = len(arrivals)
     records = []
 
-    # Pre-generate service times deterministically (enough for the run)
-    est_services = max(1000, len(arrivals)*3)
-    service_times = [rnd.expovariate(service_rate) for _ in range(est_services)]
-    service_iter = iter(service_times)
-
-    while True:
-        next_arrival_time = arrivals[next_arrival_index][0] if next_arrival_index < len(arrivals) else math.inf
-        next_service_completion = server_busy_until if server_busy else math.inf
-        next_event_time = min(next_arrival_time, next_service_completion)
-
-        if next_event_time == math.inf:
-            # no more events
-            break
-
-        now = next_event_time
-
-        # handle arrivals at this time (could be multiple very close)
-        while next_arrival_index < len(arrivals) and arrivals[next_arrival_index][0] <= now + 1e-12:
-            atime, req = arrivals[next_arrival_index]
-            now_dt = anchor + timedelta(seconds=atime)
-            priority = compute_priority(req, now_dt)
-            if discipline == 'priority':
-                heapq.heappush(heap, (-priority, counter, atime, req))
-                counter += 1
-            else:
-                q.append((atime, req))
-            next_arrival_index += 1
-
-        # if server free, start next service if queue not empty
-        if not server_busy:
-            next_item = None
-            if discipline == 'priority' and heap:
-                pr_neg, cnt, enq_t, req = heapq.heappop(heap)
-                priority_at_enqueue = -pr_neg
-                next_item = (enq_t, req, priority_at_enqueue)
-            elif discipline == 'fifo' and q:
-                enq_t, req = q.popleft()
-                priority_at_enqueue = compute_priority(req, anchor + timedelta(seconds=enq_t))
-                next_item = (enq_t, req, priority_at_enqueue)
-
-            if next_item:
-                enq_t, req, priority_at_enqueue = next_item
-                try:
-                    st = next(service_iter)
-                except StopIteration:
-                    st = rnd.expovariate(service_rate)
-                server_busy = True
-                server_busy_until = now + st
-                current_request = {
-                    'req': req,
-                    'enq_t': enq_t,
-                    'priority_at_enqueue': priority_at_enqueue,
-                    'service_start': now,
-                    'service_time': st
-                }
-            else:
-                # nothing to process; loop will advance to next arrival
-                if next_arrival_time == math.inf:
-                    break
-                continue
+    if service_times is None:
+        # Pre-generate service times deterministically (enough for the run)
+        rng = np.random.default_rng(seed)
+        service_times = rng.exponential(1.0 / service_rate, size=max(1000, n*3))
+
+    if n:
+        arrival_t = np.fromiter((a for a, _ in arrivals), dtype=np.float64, count=n)
+
+        # priority at enqueue is a pure function of the arrival, so compute it
+        # once up front and share it between ordering and the output records
+        pr_at_enq = np.fromiter(
+            (compute_priority(req, a) for a, req in arrivals),
+            dtype=np.float64, count=n,
+        )
+
+        if discipline == 'priority':
+            order, start = _service_loop_priority(arrival_t, -pr_at_enq, service_times)
         else:
-            # service completion just happened at 'now'
-            dispatch_time = now
-            rec = {
-                'id': current_request['req']['id'],
-                'supply_type': current_request['req']['supply_type'],
-                'enqueue_time': current_request['enq_t'],
-                'dispatch_time': dispatch_time,
-                'wait_sec': max(0.0, dispatch_time - current_request['enq_t']),
-                'priority_at_enqueue': current_request['priority_at_enqueue']
+            order, start = _service_loop_fifo(arrival_t, service_times)
+
+        # completion = service start + service time, in dispatch order;
+        # waits come out of one vectorized subtraction rather than per-record math
+        finish = start + service_times[:n]
+        waits = np.maximum(finish - arrival_t[order], 0.0)
+
+        finish_l = finish.tolist()
+        waits_l = waits.tolist()
+        pr_l = pr_at_enq.tolist()
+        records = [None] * n  # preallocated; the fill loop never grows the list
+        for k, j in enumerate(order.tolist()):
+            enq_t, req = arrivals[j]
+            records[k] = {
+                'id': req['id'],
+                'supply_type': req['supply_type'],
+                'enqueue_time': enq_t,
+                'dispatch_time': finish_l[k],
+                'wait_sec': waits_l[k],
+                'priority_at_enqueue': pr_l[j]
             }
-            records.append(rec)
-            # free server
-            server_busy = False
-            current_request = None
-            server_busy_until = 0.0
 
     # metrics
     wait_times = [r['wait_sec'] for r in records]
@@ -270,9 +328,14 @@ def run_sweep():
 
     for lam in arrival_rates:
         arrivals = generate_arrivals(total_time_s, lam, seed=123, anchor=anchor)
-        # use identical seeds and anchor to keep fair comparison
-        pr_metrics = simulate(arrivals, service_rate, discipline='priority', seed=999, anchor=anchor)
-        fifo_metrics = simulate(arrivals, service_rate, discipline='fifo', seed=999, anchor=anchor)
+        # one service-time stream shared by both disciplines: fair by
+        # construction, and drawn once instead of once per run
+        rng = np.random.default_rng(999)
+        service_times = rng.exponential(1.0 / service_rate, size=max(1000, len(arrivals)*3))
+        pr_metrics = simulate(arrivals, service_rate, discipline='priority', seed=999, anchor=anchor,
+                              service_times=service_times)
+        fifo_metrics = simulate(arrivals, service_rate, discipline='fifo', seed=999, anchor=anchor,
+                                service_times=service_times)
 
         print(f"Rate {lam:.3f}/s | priority mean_wait={pr_metrics['mean_wait']:.1f}s p95={pr_metrics['p95_wait']:.1f}s | "
               f"fifo mean_wait={fifo_metrics['mean_wait']:.1f}s p95={fifo_metrics['p95_wait']:.1f}s | "
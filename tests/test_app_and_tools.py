@@ -64,6 +64,34 @@ def test_dispatch_next():
     assert data["dispatched"]["request"]["id"] in ["T1", "T2"]
 
 
+def test_bulk_enqueue():
+    now = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc).isoformat()
+
+    payloads = [
+        {
+            "id": f"B{i}",
+            "supply_type": "Water",
+            "quantity": 1,
+            "timestamp": now,
+            "expiry_date": None,
+            "distance_km": 5.0,
+            "destination": "Bulk Camp",
+        }
+        for i in range(3)
+    ]
+
+    resp = client.post("/api/requests/bulk", json=payloads)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["status"] == "enqueued"
+    assert data["count"] == 3
+    assert len(data["computed_priorities"]) == 3
+
+    resp2 = client.get("/api/queue")
+    ids = [item["request"]["id"] for item in resp2.json()["items"]]
+    assert all(f"B{i}" in ids for i in range(3))
+
+
 def test_enqueue_rejects_bad_timestamp():
     bad_payload = {
         "id": "BAD1",
@@ -104,23 +132,24 @@ def test_import_via_api_smoke(tmp_path, monkeypatch):
 
     calls = {}
 
-    def fake_post(url, json):
-        calls["url"] = url
-        calls["json"] = json
+    class FakeSession:
+        def post(self, url, json):
+            calls["url"] = url
+            calls["json"] = json
 
-        class Resp:
-            status_code = 200
-            text = "ok"
+            class Resp:
+                status_code = 200
+                text = "ok"
 
-        return Resp()
+            return Resp()
 
-    monkeypatch.setattr("backend.import_csv_api.requests.post", fake_post)
+    monkeypatch.setattr("backend.import_csv_api.make_session", lambda: FakeSession())
 
     import_via_api(str(csv_file))
 
-    assert calls["url"].endswith("/api/requests")
-    assert calls["json"]["id"] == "C1"
-    assert calls["json"]["supply_type"] == "Water"
+    assert calls["url"].endswith("/api/requests/bulk")
+    assert calls["json"][0]["id"] == "C1"
+    assert calls["json"][0]["supply_type"] == "Water"
 
 
 def test_import_csv_usage_error(monkeypatch, capsys):